@@ -4,22 +4,36 @@ import shutil
 import tempfile
 import zipfile
 import asyncio
-import re
 import subprocess
-from pathlib import Path
+import threading
+import multiprocessing
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path, PurePosixPath
+from urllib.parse import quote
 from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+import aiofiles
+import anyio
+from cachetools import LRUCache, TTLCache, cached
+import diskcache
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
 import geopandas as gpd
 import numpy as np
+import orjson
+import pandas as pd
 import rasterio
-from rasterio.enums import Resampling
+import rasterio.shutil
+from rasterio.errors import RasterioIOError
+import shapely
 from shapely.geometry import Polygon, MultiPolygon
 
 # rio-tiler for dynamic COG XYZ tile generation
@@ -27,6 +41,10 @@ from rio_tiler.io import Reader as TilerReader
 from rio_tiler.errors import TileOutsideBounds
 from pyproj import Transformer
 
+
+# Use pyogrio (vectorized GDAL I/O) instead of Fiona for vector read/write
+gpd.options.io_engine = "pyogrio"
+
 app = FastAPI(title="GIS Swipe Lab API", version="1.2.0")
 
 # CORS configuration with exposed headers for Range requests
@@ -36,17 +54,88 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Range", "Content-Length", "Accept-Ranges"],
+    expose_headers=["Content-Range", "Content-Length", "Accept-Ranges", "ETag", "Last-Modified"],
 )
 
 # Paths
 UPLOAD_DIR = Path("/app/uploads")
 PROCESSED_DIR = Path("/app/processed")
+TILE_CACHE_DIR = Path("/app/tile_cache")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+TILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Disk cache of rendered PNG tiles (5GB, LRU-evicted), tagged with the source
+# COG path so a deleted layer's tiles can be evicted together
+TILE_CACHE = diskcache.Cache(str(TILE_CACHE_DIR), size_limit=5 * 1024 ** 3, tag_index=True)
+TILE_CACHE_TTL = 3600
+
+# Thread pool for tile rendering/info reads (GDAL releases the GIL during I/O)
+TILE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+tile_executor = ThreadPoolExecutor(max_workers=TILE_WORKERS)
+
+# Process pool for CPU-intensive operations (compression and overviews hold the
+# GIL in places, so conversions run in separate processes). Workers are spawned,
+# not forked: a fork could copy GDAL/VSI mutexes held by the tile threads.
+# Few workers, each with several GDAL threads: a single large upload still gets
+# multi-threaded compression/warping, and concurrent ones share the CPUs.
+CONVERSION_WORKERS = int(os.environ.get("CONVERSION_WORKERS", max(2, min(4, (os.cpu_count() or 1) // 4))))
+executor = ProcessPoolExecutor(
+    max_workers=CONVERSION_WORKERS,
+    mp_context=multiprocessing.get_context("spawn")
+)
+
+# GDAL threads per conversion, so concurrent workers don't oversubscribe the CPUs
+CONVERSION_THREADS = max(1, (os.cpu_count() or 1) // CONVERSION_WORKERS)
+
+# Total GDAL block cache (MB) for conversions, shared by the worker processes
+CONVERSION_CACHE_MB = int(os.environ.get("CONVERSION_CACHE_MB", 4096))
+
+# GDAL settings for COG conversion: a per-worker share of the compression
+# threads and block cache, internal masks and 512px overview blocks
+COG_GDAL_CONFIG = {
+    "GDAL_NUM_THREADS": str(CONVERSION_THREADS),
+    "GDAL_CACHEMAX": max(256, CONVERSION_CACHE_MB // CONVERSION_WORKERS),
+    "GDAL_TIFF_INTERNAL_MASK": "YES",
+    "GDAL_TIFF_OVR_BLOCKSIZE": "512",
+}
+
+# When set (e.g. "/_internal_processed/"), /api/cog only validates the request and
+# hands the transfer to the reverse proxy via X-Accel-Redirect (nginx sendfile)
+COG_ACCEL_REDIRECT = os.environ.get("COG_ACCEL_REDIRECT", "")
+
+# Read size per chunk when streaming COG/PMTiles bytes (override via env)
+COG_STREAM_CHUNK = int(os.environ.get("COG_STREAM_CHUNK", 1 << 20))
+
+# Seconds a file's stat result is reused before checking the file again
+FILE_STAT_TTL = 2
+
+# Leading bytes of each served file kept in memory (COG IFDs, PMTiles directories)
+HEADER_CACHE_BYTES = 512 * 1024
+
+# Internal tile size of the COGs we produce (and expect when serving)
+COG_BLOCKSIZE = 512
+
+# zlib level for rendered PNG tiles (1 = fastest; tiles are cached anyway)
+TILE_PNG_ZLEVEL = 1
 
-# Thread pool for CPU-intensive operations
-executor = ThreadPoolExecutor(max_workers=2)
+# Bump whenever tile rendering changes (render spec, ZLEVEL, colormap handling):
+# it is part of tile ETags and cache keys, so clients and the disk cache drop old tiles
+TILE_RENDER_VERSION = 2
+
+# Threads used by GDAL to decode the COG blocks touched by a single tile read
+TILE_READ_THREADS = min(8, os.cpu_count() or 1)
+
+# GDAL settings for tile reads: skip sidecar directory probes, keep IFD/header
+# bytes cached in RAM between requests and decode multi-block windows in parallel
+TILE_GDAL_CONFIG = {
+    "GDAL_NUM_THREADS": str(TILE_READ_THREADS),
+    "GDAL_CACHEMAX": 512,
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+    "VSI_CACHE": True,
+    "VSI_CACHE_SIZE": 512 * 1024 * 1024,
+}
 
 # Mount static files (for non-COG files like GeoJSON)
 app.mount("/processed", StaticFiles(directory=str(PROCESSED_DIR)), name="processed")
@@ -57,6 +146,75 @@ class LocalFileRequest(BaseModel):
     filename: str
 
 
+def read_file_range(path: Path, offset: int, count: int) -> bytes:
+    """Read count bytes at offset with a single pread (no seek, no file object)"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.pread(fd, count, offset)
+    finally:
+        os.close(fd)
+
+
+class FileRangeResponse(Response):
+    """Send a byte range of a file without a Python file-object read loop.
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers it,
+    otherwise os.pread() on a raw fd in a worker thread.
+    """
+    chunk_size = COG_STREAM_CHUNK
+
+    def __init__(
+        self,
+        path: Path,
+        offset: int,
+        count: int,
+        status_code: int = 206,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.status_code = status_code
+        self.media_type = self.media_type if media_type is None else media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            # Kernel file -> socket copy, no bytes pass through Python
+            with open(self.path, "rb", buffering=0) as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+        
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            offset = self.offset
+            remaining = self.count
+            while remaining > 0:
+                data = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, remaining), offset)
+                if not data:
+                    break
+                offset += len(data)
+                remaining -= len(data)
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+        finally:
+            os.close(fd)
+        
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
 def is_raster_file(filename: str) -> bool:
     """Check if file is a raster format"""
     return filename.lower().endswith(('.tif', '.tiff'))
@@ -67,6 +225,59 @@ def is_vector_file(filename: str) -> bool:
     return filename.lower().endswith(('.shp', '.geojson', '.json', '.zip'))
 
 
+def parse_range_header(range_header: str, file_size: int) -> Optional[tuple]:
+    """Parse "bytes=start-end" or "bytes=start-" into (start, end).
+    Only the first range of a multi-range header is used; other shapes
+    (e.g. suffix ranges "bytes=-500") return None so the full file is served.
+    """
+    if not range_header.startswith('bytes='):
+        return None
+    
+    start_str, sep, end_str = range_header[6:].partition('-')
+    end_str = end_str.split(',', 1)[0]
+    if not sep or not start_str.isdecimal() or (end_str and not end_str.isdecimal()):
+        return None
+    
+    start = int(start_str)
+    end = int(end_str) if end_str else file_size - 1
+    return start, end
+
+
+def make_etag(*parts) -> str:
+    """Weak validator from integer identifying parts (file size/mtime_ns, tile coords, ...)"""
+    return 'W/"' + '-'.join(f"{int(p):x}" for p in parts) + '"'
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against a resource"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: ignore W/ prefixes on either side
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or etag.removeprefix('W/') in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates are GMT; "-0000" offsets parse as naive, not local time
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+def has_cog_layout(profile: dict) -> bool:
+    """Check if a raster profile is internally tiled with COG-sized square blocks"""
+    return (
+        bool(profile.get('tiled', False))
+        and profile.get('blockxsize') == COG_BLOCKSIZE
+        and profile.get('blockysize') == COG_BLOCKSIZE
+    )
+
+
 # ============================================================
 # COG Streaming Endpoint with HTTP Range Request Support
 # This properly returns 206 Partial Content for georaster streaming
@@ -92,13 +303,34 @@ async def get_cog_file(
     if filename.lower().endswith('.ovr'):
         raise HTTPException(status_code=404, detail="External overview not found (using internal overviews)")
     
-    if not file_path.exists():
+    # Stat results are cached for a few seconds across requests
+    try:
+        file_stat = get_file_stat(str(file_path))
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
     
     if not file_path.suffix.lower() in ['.tif', '.tiff', '.pmtiles']:
         raise HTTPException(status_code=400, detail="Only TIF and PMTiles files are served via this endpoint")
     
-    file_size = file_path.stat().st_size
+    file_size = file_stat.st_size
+    
+    # Striped TIFFs turn every partial read into a whole-strip scan - only serve COG layouts
+    if file_path.suffix.lower() in ['.tif', '.tiff']:
+        try:
+            profile = await anyio.to_thread.run_sync(get_tiff_profile, str(file_path), file_stat.st_mtime)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File not found: {filename}")
+        except RasterioIOError as e:
+            raise HTTPException(status_code=409, detail=f"File is not a readable TIFF: {filename} ({e})")
+        
+        if not has_cog_layout(profile):
+            raise HTTPException(
+                status_code=409,
+                detail=(
+                    f"File is not a tiled COG ({COG_BLOCKSIZE}x{COG_BLOCKSIZE} blocks): {filename}. "
+                    "Re-upload the source via /api/upload, or copy it to uploads/ and process it via /api/upload-local"
+                )
+            )
     
     # Determine content type based on file extension
     if file_path.suffix.lower() == '.pmtiles':
@@ -106,21 +338,31 @@ async def get_cog_file(
     else:
         content_type = "image/tiff"
     
+    etag = make_etag(file_size, file_stat.st_mtime_ns)
     headers = {
         "Accept-Ranges": "bytes",
         "Content-Type": content_type,
+        "ETag": etag,
+        "Last-Modified": formatdate(file_stat.st_mtime, usegmt=True),
         "Access-Control-Allow-Origin": "*",
-        "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges",
+        "Access-Control-Expose-Headers": "Content-Range, Content-Length, Accept-Ranges, ETag, Last-Modified",
     }
     
+    # Client already has this version - revalidation without a body
+    if is_not_modified(request, etag, file_stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    
+    # Behind nginx: let the proxy stream the file (and handle Range) with sendfile
+    if COG_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = COG_ACCEL_REDIRECT + quote(filename)
+        return Response(content=None, status_code=200, headers=headers)
+    
     # Handle Range request
     if range:
         # Parse Range header: "bytes=start-end" or "bytes=start-"
-        range_match = re.match(r'bytes=(\d+)-(\d*)', range)
-        if range_match:
-            start = int(range_match.group(1))
-            end_str = range_match.group(2)
-            end = int(end_str) if end_str else file_size - 1
+        byte_range = parse_range_header(range, file_size)
+        if byte_range:
+            start, end = byte_range
             
             # Clamp end to file size
             end = min(end, file_size - 1)
@@ -130,25 +372,36 @@ async def get_cog_file(
             
             content_length = end - start + 1
             
-            # Read specific byte range
-            def iter_file_range():
-                with open(file_path, "rb") as f:
-                    f.seek(start)
-                    remaining = content_length
-                    chunk_size = 64 * 1024  # 64KB chunks
-                    while remaining > 0:
-                        read_size = min(chunk_size, remaining)
-                        data = f.read(read_size)
-                        if not data:
-                            break
-                        remaining -= len(data)
-                        yield data
-            
             headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
             headers["Content-Length"] = str(content_length)
             
-            return StreamingResponse(
-                iter_file_range(),
+            # COG IFDs / PMTiles directories sit at the start of the file - serve from memory
+            if end < HEADER_CACHE_BYTES:
+                # A miss is a 512KB pread, so don't run it on the event loop
+                header = await anyio.to_thread.run_sync(
+                    read_file_header, str(file_path), file_stat.st_mtime, file_size
+                )
+                return Response(
+                    content=header[start:end + 1],
+                    status_code=206,
+                    headers=headers,
+                    media_type="image/tiff"
+                )
+            
+            # Typical COG reads (headers, tiles) fit in one chunk - single pread, no streaming
+            if content_length <= COG_STREAM_CHUNK:
+                data = await anyio.to_thread.run_sync(read_file_range, file_path, start, content_length)
+                return Response(
+                    content=data,
+                    status_code=206,
+                    headers=headers,
+                    media_type="image/tiff"
+                )
+            
+            return FileRangeResponse(
+                file_path,
+                start,
+                content_length,
                 status_code=206,
                 headers=headers,
                 media_type="image/tiff"
@@ -164,32 +417,173 @@ async def get_cog_file(
             media_type="image/tiff"
         )
     
-    # GET without Range header - return full file with streaming
-    def iter_file():
-        with open(file_path, "rb") as f:
-            chunk_size = 64 * 1024
-            while True:
-                data = f.read(chunk_size)
-                if not data:
-                    break
-                yield data
-    
+    # GET without Range header - send the whole file the same zero-copy way
     headers["Content-Length"] = str(file_size)
     
-    return StreamingResponse(
-        iter_file(),
+    return FileRangeResponse(
+        file_path,
+        0,
+        file_size,
         status_code=200,
         headers=headers,
         media_type=content_type
     )
 
 
+@cached(cache=TTLCache(maxsize=1024, ttl=FILE_STAT_TTL), lock=threading.Lock())
+def get_file_stat(path_str: str) -> os.stat_result:
+    """Stat a processed file, reusing the result for FILE_STAT_TTL seconds so a
+    replaced or removed file is noticed; call get_file_stat.cache_clear() after
+    changing files through the API
+    """
+    return os.stat(path_str)
+
+
+@lru_cache(maxsize=64)
+def read_file_header(path_str: str, mtime: float, size: int) -> bytes:
+    """Read the first HEADER_CACHE_BYTES of a file once; keyed on mtime/size so
+    a replaced file is re-read
+    """
+    return read_file_range(Path(path_str), 0, min(size, HEADER_CACHE_BYTES))
+
+
+@lru_cache(maxsize=1024)
+def get_tiff_profile(path_str: str, mtime: float) -> dict:
+    """Read the rasterio profile of a TIFF once; keyed on mtime like the readers"""
+    with rasterio.open(path_str) as src:
+        return dict(src.profile)
+
+
+class ReaderPoolCache(LRUCache):
+    """LRU of idle rio-tiler readers per (path, mtime); evicted readers are closed"""
+
+    def popitem(self):
+        key, readers = super().popitem()
+        for reader in readers:
+            reader.close()
+        return key, readers
+
+
+# Open readers are reused across tile requests so each COG's IFDs/overviews are
+# parsed once. A GDAL dataset handle must not be shared between threads, so a
+# reader is checked out for exclusive use and returned to the pool afterwards.
+READER_POOL = ReaderPoolCache(maxsize=32)
+READER_POOL_LOCK = threading.Lock()
+READERS_PER_FILE = 8
+
+# Bumped per path by close_pooled_readers; readers checked out under an older
+# generation are closed on return instead of going back to the pool
+READER_GENERATIONS: dict = {}
+
+
+@contextmanager
+def pooled_tile_reader(path_str: str, mtime: float):
+    """Check out an idle reader for a COG (or open a new one) and return it when done.
+    Keyed on mtime so a replaced file gets fresh readers.
+    """
+    key = (path_str, mtime)
+    with READER_POOL_LOCK:
+        generation = READER_GENERATIONS.get(path_str, 0)
+        idle = READER_POOL.get(key)
+        reader = idle.pop() if idle else None
+    
+    if reader is None:
+        reader = TilerReader(path_str)
+    
+    try:
+        yield reader
+    finally:
+        with READER_POOL_LOCK:
+            # Don't pool readers of a file evicted (deleted) while in use
+            if READER_GENERATIONS.get(path_str, 0) == generation:
+                idle = READER_POOL.setdefault(key, [])
+                if len(idle) < READERS_PER_FILE:
+                    idle.append(reader)
+                    reader = None
+        if reader is not None:
+            reader.close()
+
+
+def close_pooled_readers(path_str: str) -> None:
+    """Close the idle readers of a file (all mtimes) so its disk space is released;
+    readers still in use are closed when they are returned
+    """
+    with READER_POOL_LOCK:
+        READER_GENERATIONS[path_str] = READER_GENERATIONS.get(path_str, 0) + 1
+        keys = [key for key in READER_POOL if key[0] == path_str]
+        stale = [reader for key in keys for reader in READER_POOL.pop(key)]
+    for reader in stale:
+        reader.close()
+
+
+# The key deliberately ignores `dataset`: it is always an open handle on
+# path_str as of mtime, so (path_str, mtime) identifies what it would return
+@cached(
+    cache=LRUCache(maxsize=256),
+    key=lambda path_str, mtime, dataset: (path_str, mtime),
+    lock=threading.Lock()
+)
+def get_render_spec(path_str: str, mtime: float, dataset) -> dict:
+    """Work out the PNG render options of a COG once instead of on every tile.
+    Reads from the already open (pooled) dataset; cached per path and mtime.
+    """
+    colormap = None
+    if dataset.count == 1:
+        try:
+            colormap = dataset.colormap(1)
+        except ValueError:
+            pass  # No palette
+    
+    return {
+        "add_mask": True,
+        "colormap": colormap,
+        "ZLEVEL": TILE_PNG_ZLEVEL,
+    }
+
+
+def render_tile_sync(file_path: Path, x: int, y: int, z: int, mtime: float) -> bytes:
+    """Render one XYZ tile to PNG (runs in the tile thread pool)"""
+    with rasterio.Env(**TILE_GDAL_CONFIG), pooled_tile_reader(str(file_path), mtime) as src:
+        spec = get_render_spec(str(file_path), mtime, src.dataset)
+        img = src.tile(x, y, z)
+    
+    # Render to PNG with proper handling of nodata/alpha
+    return img.render(img_format="PNG", **spec)
+
+
+def get_or_render_tile_sync(cache_key: str, file_path: Path, x: int, y: int, z: int, mtime: float) -> tuple:
+    """Return (png, cache_hit) from the disk tile cache, rendering and storing on a miss"""
+    content = TILE_CACHE.get(cache_key)
+    if content is not None:
+        return content, True
+    
+    content = render_tile_sync(file_path, x, y, z, mtime)
+    TILE_CACHE.set(cache_key, content, expire=TILE_CACHE_TTL, tag=str(file_path))
+    return content, False
+
+
 # ============================================================
 # Dynamic XYZ Tile Endpoint for COG files
 # Uses rio-tiler to generate tiles on-the-fly for MapLibre
 # ============================================================
+# 1x1 transparent PNG returned for tiles outside the raster bounds
+TRANSPARENT_PNG = bytes.fromhex(
+    "89504E470D0A1A0A0000000D494844520000000100000001"
+    "08060000001F15C4890000000A49444154789C6300010000"
+    "0500010D0A2DB40000000049454E44AE426082"
+)
+
+# Response headers for rendered tiles
+TILE_HEADERS = {
+    "Cache-Control": "public, max-age=3600",
+    "Access-Control-Allow-Origin": "*"
+}
+TILE_HIT_HEADERS = {**TILE_HEADERS, "X-Cache": "HIT"}
+TILE_MISS_HEADERS = {**TILE_HEADERS, "X-Cache": "MISS"}
+
+
 @app.get("/api/tiles/{z}/{x}/{y}.png")
-async def get_xyz_tile(z: int, x: int, y: int, url: str):
+async def get_xyz_tile(z: int, x: int, y: int, url: str, request: Request):
     """
     Generate XYZ tiles dynamically from a COG file.
     This offloads heavy tile generation to the server (GPU-independent),
@@ -205,51 +599,101 @@ async def get_xyz_tile(z: int, x: int, y: int, url: str):
     
     file_path = (PROCESSED_DIR / url).absolute()
     
-    if not file_path.exists():
+    # One (cached) stat both checks existence and provides size/mtime
+    try:
+        file_stat = get_file_stat(str(file_path))
+    except FileNotFoundError:
         print(f"[ERROR] Tile file not found: {file_path}")
         raise HTTPException(status_code=404, detail=f"File not found: {url}")
     
     if not file_path.suffix.lower() in ['.tif', '.tiff']:
         raise HTTPException(status_code=400, detail="Only TIF files supported for tile generation")
     
+    # A tile only changes when its source COG or the rendering does; mtime_ns
+    # (plus size) also catches a file replaced within the same second
+    mtime = file_stat.st_mtime
+    etag = make_etag(file_stat.st_size, file_stat.st_mtime_ns, TILE_RENDER_VERSION, z, x, y)
+    validators = {"ETag": etag, "Last-Modified": formatdate(mtime, usegmt=True)}
+    if is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers={**TILE_HEADERS, **validators})
+    
+    # Rendered tiles are shared across clients; mtime and render version in the key drop stale ones
+    cache_key = f"{url}:{z}:{x}:{y}:{file_stat.st_mtime_ns}:{TILE_RENDER_VERSION}"
+    
     try:
-        with TilerReader(str(file_path)) as src:
-            img = src.tile(x, y, z)
-            
-            # Render to PNG with proper handling of nodata/alpha
-            content = img.render(img_format="PNG")
-            
-            return Response(
-                content=content,
-                media_type="image/png",
-                headers={
-                    "Cache-Control": "public, max-age=3600",
-                    "Access-Control-Allow-Origin": "*"
-                }
-            )
+        # Cache I/O (SQLite + files), GDAL reads and PNG encoding all block,
+        # so keep them off the event loop
+        loop = asyncio.get_event_loop()
+        content, hit = await loop.run_in_executor(
+            tile_executor,
+            get_or_render_tile_sync,
+            cache_key,
+            file_path,
+            x,
+            y,
+            z,
+            mtime
+        )
+        
+        return Response(
+            content=content,
+            media_type="image/png",
+            headers={**(TILE_HIT_HEADERS if hit else TILE_MISS_HEADERS), **validators}
+        )
     except TileOutsideBounds:
         # Return transparent PNG for tiles outside the raster bounds
-        # 1x1 transparent PNG
-        transparent_png = bytes([
-            0x89, 0x50, 0x4E, 0x47, 0x0D, 0x0A, 0x1A, 0x0A, 0x00, 0x00, 0x00, 0x0D,
-            0x49, 0x48, 0x44, 0x52, 0x00, 0x00, 0x00, 0x01, 0x00, 0x00, 0x00, 0x01,
-            0x08, 0x06, 0x00, 0x00, 0x00, 0x1F, 0x15, 0xC4, 0x89, 0x00, 0x00, 0x00,
-            0x0A, 0x49, 0x44, 0x41, 0x54, 0x78, 0x9C, 0x63, 0x00, 0x01, 0x00, 0x00,
-            0x05, 0x00, 0x01, 0x0D, 0x0A, 0x2D, 0xB4, 0x00, 0x00, 0x00, 0x00, 0x49,
-            0x45, 0x4E, 0x44, 0xAE, 0x42, 0x60, 0x82
-        ])
         return Response(
-            content=transparent_png,
+            content=TRANSPARENT_PNG,
             media_type="image/png",
-            headers={
-                "Cache-Control": "public, max-age=3600",
-                "Access-Control-Allow-Origin": "*"
-            }
+            headers={**TILE_HEADERS, **validators}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Tile generation error: {str(e)}")
 
 
+@lru_cache(maxsize=64)
+def get_wgs84_transformer(src_crs_wkt: str) -> Transformer:
+    """Build (once per CRS) a transformer to EPSG:4326; PROJ setup is the costly part"""
+    return Transformer.from_crs(src_crs_wkt, "EPSG:4326", always_xy=True)
+
+
+def read_tile_info_sync(file_path: Path, mtime: float) -> dict:
+    """Read bounds/zoom/band info of a COG (runs in the tile thread pool)"""
+    with rasterio.Env(**TILE_GDAL_CONFIG), pooled_tile_reader(str(file_path), mtime) as src:
+        # Get info
+        info = src.info()
+        
+        # Explicitly get WGS84 bounds
+        # src.bounds is usually WGS84 in rio-tiler Reader, 
+        # but let's double check the CRS and reproject if needed.
+        raw_bounds = src.dataset.bounds
+        src_crs = src.dataset.crs
+        
+        if src_crs and src_crs != "EPSG:4326":
+            try:
+                # Both corners in one PROJ call
+                (min_lon, max_lon), (min_lat, max_lat) = get_wgs84_transformer(src_crs.to_wkt()).transform(
+                    [raw_bounds.left, raw_bounds.right],
+                    [raw_bounds.bottom, raw_bounds.top]
+                )
+                bounds = [min_lon, min_lat, max_lon, max_lat]
+                print(f"[DEBUG] Reprojected bounds from {src_crs} to EPSG:4326: {bounds}")
+            except Exception as e:
+                print(f"[WARN] Reprojection failed, falling back to src.bounds: {e}")
+                bounds = src.bounds
+        else:
+            bounds = src.bounds
+
+        return {
+            "bounds": bounds,
+            "minzoom": getattr(info, "minzoom", getattr(src, "minzoom", 0)),
+            "maxzoom": getattr(info, "maxzoom", getattr(src, "maxzoom", 22)),
+            "band_metadata": getattr(info, "band_metadata", []),
+            "dtype": getattr(info, "dtype", "uint8"),
+            "colorinterp": getattr(info, "colorinterp", None)
+        }
+
+
 @app.get("/api/tiles/info")
 async def get_tile_info(url: str):
     """
@@ -265,120 +709,116 @@ async def get_tile_info(url: str):
     
     print(f"[DEBUG] Tile info requested for: {url}")
     print(f"[DEBUG] Full path: {file_path}")
-    print(f"[DEBUG] File exists: {file_path.exists()}")
     
-    if not file_path.exists():
+    try:
+        mtime = get_file_stat(str(file_path)).st_mtime
+    except FileNotFoundError:
         # List available files for debugging
+        print("[DEBUG] File exists: False")
         available = [f.name for f in PROCESSED_DIR.iterdir() if f.suffix.lower() in ['.tif', '.tiff']]
         print(f"[DEBUG] Available TIF files: {available}")
         raise HTTPException(status_code=404, detail=f"File not found: {url}. Available: {available[:5]}")
     
     try:
-        with TilerReader(str(file_path)) as src:
-            # Get info
-            info = src.info()
-            
-            # Explicitly get WGS84 bounds
-            # src.bounds is usually WGS84 in rio-tiler Reader, 
-            # but let's double check the CRS and reproject if needed.
-            raw_bounds = src.dataset.bounds
-            src_crs = src.dataset.crs
-            
-            if src_crs and src_crs != "EPSG:4326":
-                try:
-                    transformer = Transformer.from_crs(src_crs, "EPSG:4326", always_xy=True)
-                    min_lon, min_lat = transformer.transform(raw_bounds.left, raw_bounds.bottom)
-                    max_lon, max_lat = transformer.transform(raw_bounds.right, raw_bounds.top)
-                    bounds = [min_lon, min_lat, max_lon, max_lat]
-                    print(f"[DEBUG] Reprojected bounds from {src_crs} to EPSG:4326: {bounds}")
-                except Exception as e:
-                    print(f"[WARN] Reprojection failed, falling back to src.bounds: {e}")
-                    bounds = src.bounds
-            else:
-                bounds = src.bounds
-
-            return {
-                "bounds": bounds,
-                "minzoom": getattr(info, "minzoom", getattr(src, "minzoom", 0)),
-                "maxzoom": getattr(info, "maxzoom", getattr(src, "maxzoom", 22)),
-                "band_metadata": getattr(info, "band_metadata", []),
-                "dtype": getattr(info, "dtype", "uint8"),
-                "colorinterp": getattr(info, "colorinterp", None)
-            }
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(tile_executor, read_tile_info_sync, file_path, mtime)
     except Exception as e:
         print(f"[ERROR] Error reading COG info for {file_path}:")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error reading COG info: {str(e)}")
 
 
-def convert_to_cog(input_path: Path, output_path: Path) -> None:
+def convert_to_cog(input_path: Path, output_path: Path) -> list:
     """Convert raster to Cloud Optimized GeoTIFF with overviews for fast loading.
     Reprojects to EPSG:3857 (Web Mercator) for proper display in web maps.
+    GDAL's COG driver warps, tiles, compresses and builds overviews in a single
+    pass, writing the IFD-first layout directly.
+    
+    Returns:
+        List of warning messages about the input (empty if none)
     """
-    from rasterio.warp import calculate_default_transform, reproject
+    from rasterio.warp import calculate_default_transform
     from rasterio.crs import CRS
     
     dst_crs = CRS.from_epsg(3857)  # Web Mercator for Leaflet
     
-    with rasterio.open(input_path) as src:
-        # Calculate transform for reprojection
-        transform, width, height = calculate_default_transform(
+    warnings = []
+    
+    with rasterio.Env(**COG_GDAL_CONFIG), rasterio.open(input_path) as src:
+        # Striped (untiled) inputs force whole-strip reads for every output tile
+        if not has_cog_layout(src.profile):
+            bh, bw = src.block_shapes[0]
+            print(f"[COG] Input is not tiled {COG_BLOCKSIZE}x{COG_BLOCKSIZE} (blocks: {bw}x{bh}): {input_path.name}")
+            if src.profile.get('tiled', False):
+                warnings.append(
+                    f"Input raster is tiled at {bw}x{bh}, expected {COG_BLOCKSIZE}x{COG_BLOCKSIZE}; "
+                    "conversion may be slower"
+                )
+            else:
+                warnings.append(
+                    f"Input raster is not internally tiled (strips of {bw}x{bh}); "
+                    "conversion may be slow and memory-hungry"
+                )
+        
+        # Output size after reprojection (for overview and BigTIFF decisions)
+        _, width, height = calculate_default_transform(
             src.crs, dst_crs, src.width, src.height, *src.bounds
         )
         
         # Determine predictor based on data type
         dtype = src.dtypes[0]
-        predictor = 2 if dtype in ['uint8', 'uint16', 'int16', 'uint32', 'int32'] else 3
+        predictor = 'STANDARD' if dtype in ['uint8', 'uint16', 'int16', 'uint32', 'int32'] else 'FLOATING_POINT'
+        
+        # BigTIFF only when the uncompressed output could approach the 4GB limit
+        estimated_bytes = width * height * src.count * np.dtype(dtype).itemsize
+        bigtiff = 'IF_SAFER' if estimated_bytes < 3.8 * 1024 ** 3 else 'YES'
+        
+        # Build comprehensive overviews for all zoom levels
+        overview_levels = [2, 4, 8, 16, 32, 64]
         
-        # Create profile for COG with optimized settings
-        profile = src.profile.copy()
-        profile.update(
-            driver='GTiff',
-            crs=dst_crs,
-            transform=transform,
-            width=width,
-            height=height,
-            tiled=True,
-            blockxsize=512,
-            blockysize=512,
-            compress='DEFLATE',
-            predictor=predictor,
-            interleave='band',
-            bigtiff='YES',
+        # Filter overview levels based on image size
+        min_dim = min(width, height)
+        valid_levels = [l for l in overview_levels if min_dim // l >= 64]
+        
+        creation_options = dict(
+            TARGET_SRS='EPSG:3857',
+            WARP_RESAMPLING='BILINEAR',
+            BLOCKSIZE=str(COG_BLOCKSIZE),
+            COMPRESS='DEFLATE',
+            PREDICTOR=predictor,
+            BIGTIFF=bigtiff,
+            NUM_THREADS=str(CONVERSION_THREADS),
+            OVERVIEW_RESAMPLING='AVERAGE',
         )
+        if valid_levels:
+            creation_options['OVERVIEW_COUNT'] = str(len(valid_levels))
+        else:
+            creation_options['OVERVIEWS'] = 'NONE'
         
-        with rasterio.open(output_path, 'w', **profile) as dst:
-            # Reproject each band
-            for band_idx in range(1, src.count + 1):
-                reproject(
-                    source=rasterio.band(src, band_idx),
-                    destination=rasterio.band(dst, band_idx),
-                    src_transform=src.transform,
-                    src_crs=src.crs,
-                    dst_transform=transform,
-                    dst_crs=dst_crs,
-                    resampling=Resampling.bilinear
-                )
-            
-            # Build comprehensive overviews for all zoom levels
-            overview_levels = [2, 4, 8, 16, 32, 64]
-            
-            # Filter overview levels based on image size
-            min_dim = min(width, height)
-            valid_levels = [l for l in overview_levels if min_dim // l >= 64]
-            
-            if valid_levels:
-                dst.build_overviews(valid_levels, Resampling.average)
-                dst.update_tags(ns='rio_overview', resampling='average')
+        rasterio.shutil.copy(src, str(output_path), driver='COG', **creation_options)
+    
+    return warnings
+
 
+# Unit-circle samples shared by every ellipse
+ELLIPSE_POINTS = 64
+_ANGLES = np.linspace(0, 2*np.pi, ELLIPSE_POINTS, endpoint=False)
+_COS = np.cos(_ANGLES)
+_SIN = np.sin(_ANGLES)
 
-def polygon_to_ellipse(poly, num_points=64):
-    """Convert a polygon to an elliptical approximation based on its MRR"""
+
+def polygon_to_ellipse(poly, num_points=ELLIPSE_POINTS, mrr=None):
+    """Convert a polygon to an elliptical approximation based on its MRR
+    
+    Args:
+        mrr: Precomputed minimum rotated rectangle of poly (computed if None)
+    """
     if poly.is_empty:
         return poly
         
     # Minimum rotated rectangle (MRR)
-    mrr = poly.minimum_rotated_rectangle
+    if mrr is None:
+        mrr = poly.minimum_rotated_rectangle
     if mrr.geom_type != 'Polygon':
         return poly
         
@@ -406,32 +846,107 @@ def polygon_to_ellipse(poly, num_points=64):
     u1 = v1 / len1
     u2 = v2 / len2
     
-    # Generate ellipse points
-    angles = np.linspace(0, 2*np.pi, num_points, endpoint=False)
-    ellipse_points = []
-    for angle in angles:
-        # P = Center + a*cos(t)*u1 + b*sin(t)*u2
-        p = center + a * np.cos(angle) * u1 + b * np.sin(angle) * u2
-        ellipse_points.append(tuple(p))
-        
+    if num_points == ELLIPSE_POINTS:
+        cos, sin = _COS, _SIN
+    else:
+        angles = np.linspace(0, 2*np.pi, num_points, endpoint=False)
+        cos, sin = np.cos(angles), np.sin(angles)
+    
+    # P = Center + a*cos(t)*u1 + b*sin(t)*u2, for all t at once -> (num_points, 2)
+    ellipse_points = center + (a * cos)[:, None] * u1 + (b * sin)[:, None] * u2
+    
     return Polygon(ellipse_points)
 
 
-def transform_geometry_to_ellipse(geom):
-    """Handle both Polygon and MultiPolygon for ellipse transformation"""
-    from shapely.geometry import MultiPolygon
+def transform_geometries_to_ellipses(geoms) -> np.ndarray:
+    """Handle both Polygon and MultiPolygon for ellipse transformation.
+    MRRs of all polygon parts are computed in a single vectorized shapely call;
+    other geometry types are returned unchanged.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    result = geoms.copy()
+    
+    # Shapely type ids: 3 = Polygon, 6 = MultiPolygon
+    type_ids = shapely.get_type_id(geoms)
+    poly_idx = np.flatnonzero((type_ids == 3) | (type_ids == 6))
+    
+    parts, owners = shapely.get_parts(geoms[poly_idx], return_index=True)
+    mrrs = shapely.minimum_rotated_rectangle(parts)
+    
+    # Regroup ellipses by their source geometry
+    grouped = {}
+    for owner, part, mrr in zip(owners, parts, mrrs):
+        grouped.setdefault(owner, []).append(polygon_to_ellipse(part, mrr=mrr))
+    
+    for owner, ellipses in grouped.items():
+        idx = poly_idx[owner]
+        result[idx] = ellipses[0] if type_ids[idx] == 3 else MultiPolygon(ellipses)
+    
+    return result
+
+
+# Features serialized per batch when writing GeoJSON
+GEOJSON_WRITE_BATCH = 10_000
+
+
+def _json_default(value):
+    """orjson fallback for pandas scalars (Timestamp, NaT, ...) and other leftovers"""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def write_geojson(gdf: gpd.GeoDataFrame, output_path: Path, ndjson_path: Optional[Path] = None) -> None:
+    """Stream a GeoDataFrame to a GeoJSON FeatureCollection.
+    Geometries are serialized in one vectorized shapely call and properties with
+    orjson, writing feature by feature instead of going through OGR.
+    If ndjson_path is given, the same features are also written one per line
+    (newline-delimited GeoJSON, which tippecanoe can read in parallel).
+    """
+    attributes = gdf.drop(columns=gdf.geometry.name)
     
-    if geom.geom_type == 'Polygon':
-        return polygon_to_ellipse(geom)
-    elif geom.geom_type == 'MultiPolygon':
-        return MultiPolygon([polygon_to_ellipse(p) for p in geom.geoms])
-    return geom
+    with ExitStack() as stack:
+        f = stack.enter_context(open(output_path, 'wb', buffering=1024 * 1024))
+        nd = stack.enter_context(open(ndjson_path, 'wb', buffering=1024 * 1024)) if ndjson_path else None
+        
+        f.write(b'{"type":"FeatureCollection","features":[\n')
+        # Serialize in bounded batches so only one batch of strings/dicts is alive
+        for start in range(0, len(gdf), GEOJSON_WRITE_BATCH):
+            stop = start + GEOJSON_WRITE_BATCH
+            geometries = shapely.to_geojson(gdf.geometry.values[start:stop])
+            properties = attributes.iloc[start:stop].to_dict('records')
+            
+            for i, (geometry, props) in enumerate(zip(geometries, properties), start):
+                feature = b''.join((
+                    b'{"type":"Feature","properties":',
+                    orjson.dumps(props, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY),
+                    b',"geometry":',
+                    geometry.encode() if geometry is not None else b'null',
+                    b'}',
+                ))
+                if i:
+                    f.write(b',\n')
+                f.write(feature)
+                if nd is not None:
+                    nd.write(feature)
+                    nd.write(b'\n')
+        f.write(b'\n]}\n')
 
 
-def convert_vector_to_geojson(input_path: Path, output_path: Path, original_filename: Optional[str] = None) -> None:
+def convert_vector_to_geojson(
+    input_path: Path,
+    output_path: Path,
+    original_filename: Optional[str] = None,
+    ndjson_path: Optional[Path] = None
+) -> None:
     """Convert vector file to GeoJSON with EPSG:4326.
     No simplification - preserve original geometry for accurate rendering.
     MapLibre + PMTiles handles large datasets efficiently via GPU.
+    
+    Args:
+        ndjson_path: Also write the features as newline-delimited GeoJSON here
     """
     gdf = gpd.read_file(input_path)
     
@@ -450,15 +965,25 @@ def convert_vector_to_geojson(input_path: Path, output_path: Path, original_file
     if is_cd_layer:
         print(f"[DEBUG] Generating ellipses for CD layer: {input_path.name}")
         # Apply ellipse transformation to all geometries
-        gdf.geometry = gdf.geometry.apply(transform_geometry_to_ellipse)
+        gdf.geometry = gpd.GeoSeries(
+            transform_geometries_to_ellipses(gdf.geometry.values),
+            index=gdf.index,
+            crs=gdf.crs
+        )
         print(f"[DEBUG] Ellipse transformation complete for {len(gdf)} features")
     
     # Save as GeoJSON without simplification
-    gdf.to_file(output_path, driver='GeoJSON')
+    write_geojson(gdf, output_path, ndjson_path)
 
 
-def convert_geojson_to_pmtiles(geojson_path: Path, output_path: Path) -> None:
-    """Convert GeoJSON to PMTiles using tippecanoe for fast vector tile rendering"""
+def convert_geojson_to_pmtiles(geojson_path: Path, output_path: Path, layer_name: Optional[str] = None) -> None:
+    """Convert GeoJSON to PMTiles using tippecanoe for fast vector tile rendering.
+    Pass newline-delimited GeoJSON so tippecanoe can split the input across threads.
+    
+    Args:
+        layer_name: Vector layer id in the tiles (defaults to the output file stem,
+            since tippecanoe would otherwise name it after the input file)
+    """
     try:
         result = subprocess.run(
             [
@@ -466,6 +991,9 @@ def convert_geojson_to_pmtiles(geojson_path: Path, output_path: Path) -> None:
                 "-zg",  # Auto zoom levels based on data density
                 "--drop-densest-as-needed",  # Minimal data loss while respecting tile size
                 "--extend-zooms-if-still-dropping",  # Extend max zoom if needed
+                "--read-parallel",  # Parse newline-delimited input with multiple threads
+                "--hilbert",  # Order features along a Hilbert curve for better locality
+                "-l", layer_name or output_path.stem,  # source-layer name
                 "-o", str(output_path),
                 "--force",  # Overwrite output if exists
                 str(geojson_path)
@@ -480,10 +1008,27 @@ def convert_geojson_to_pmtiles(geojson_path: Path, output_path: Path) -> None:
         raise RuntimeError(f"PMTiles conversion failed: {e.stderr}")
 
 
+SHAPEFILE_EXTENSIONS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+
 def extract_shapefile_from_zip(zip_path: Path, extract_dir: Path) -> Optional[Path]:
-    """Extract shapefile from zip and return .shp path"""
+    """Extract shapefile components from zip and return .shp path.
+    Only the shapefile sidecar files are extracted, using 1MB copy buffers.
+    """
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+        for info in zip_ref.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(SHAPEFILE_EXTENSIONS):
+                continue
+            
+            # Security: skip absolute paths and path traversal entries
+            member = PurePosixPath(info.filename)
+            if member.is_absolute() or '..' in member.parts:
+                continue
+            
+            target = extract_dir.joinpath(*member.parts)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with zip_ref.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, length=1024 * 1024)
     
     # Find .shp file
     for file in extract_dir.rglob('*.shp'):
@@ -491,18 +1036,20 @@ def extract_shapefile_from_zip(zip_path: Path, extract_dir: Path) -> Optional[Pa
     return None
 
 
-async def stream_upload_to_disk(file: UploadFile, destination: Path, chunk_size: int = 1024 * 1024) -> None:
-    """Stream upload file to disk in chunks (1MB default) to avoid memory issues"""
-    with open(destination, "wb") as buffer:
+async def stream_upload_to_disk(file: UploadFile, destination: Path, chunk_size: int = 4 * 1024 * 1024) -> None:
+    """Stream upload file to disk in chunks (4MB default) to avoid memory issues.
+    Writes go through aiofiles so disk I/O never blocks the event loop.
+    """
+    async with aiofiles.open(destination, "wb") as buffer:
         while True:
             chunk = await file.read(chunk_size)
             if not chunk:
                 break
-            buffer.write(chunk)
+            await buffer.write(chunk)
 
 
 def process_file_sync(input_path: Path, filename: str, file_id: str, keep_source: bool = False) -> dict:
-    """Synchronous file processing (runs in thread pool)
+    """Synchronous file processing (runs in process pool)
     
     Args:
         keep_source: If True, don't delete the source file after processing
@@ -513,13 +1060,13 @@ def process_file_sync(input_path: Path, filename: str, file_id: str, keep_source
         if is_raster_file(filename):
             output_name = f"{original_name}_{file_id}.tif"
             output_path = PROCESSED_DIR / output_name
-            convert_to_cog(input_path, output_path)
+            warnings = convert_to_cog(input_path, output_path)
             
             # Clean up input file if it's in uploads directory (unless keep_source)
             if not keep_source and input_path.parent == UPLOAD_DIR:
                 input_path.unlink(missing_ok=True)
             
-            return {
+            result = {
                 "success": True,
                 "id": file_id,
                 "name": original_name,
@@ -528,6 +1075,11 @@ def process_file_sync(input_path: Path, filename: str, file_id: str, keep_source
                 "message": "Raster converted to COG successfully"
             }
             
+            if warnings:
+                result["warnings"] = warnings
+            
+            return result
+            
         elif is_vector_file(filename):
             temp_dir = None
             actual_input = input_path
@@ -544,21 +1096,27 @@ def process_file_sync(input_path: Path, filename: str, file_id: str, keep_source
                     raise ValueError("No shapefile found in zip")
                 actual_input = shp_path
             
-            # Process vector
+            # Process vector (plus a temporary line-delimited copy for tippecanoe)
             output_name = f"{original_name}_{file_id}.geojson"
             output_path = PROCESSED_DIR / output_name
-            convert_vector_to_geojson(actual_input, output_path, filename)
+            ndjson_fd, ndjson_name = tempfile.mkstemp(suffix=".ndjson")
+            os.close(ndjson_fd)
+            ndjson_path = Path(ndjson_name)
             
             # Convert to PMTiles for fast vector tile rendering
             pmtiles_name = f"{original_name}_{file_id}.pmtiles"
             pmtiles_path = PROCESSED_DIR / pmtiles_name
             pmtiles_url = None
             try:
-                convert_geojson_to_pmtiles(output_path, pmtiles_path)
-                pmtiles_url = f"/processed/{pmtiles_name}"
-            except Exception as pmtiles_error:
-                print(f"[PMTiles] Warning: Could not generate PMTiles: {pmtiles_error}")
-                # Continue without PMTiles - fallback to GeoJSON
+                convert_vector_to_geojson(actual_input, output_path, filename, ndjson_path)
+                try:
+                    convert_geojson_to_pmtiles(ndjson_path, pmtiles_path, output_path.stem)
+                    pmtiles_url = f"/processed/{pmtiles_name}"
+                except Exception as pmtiles_error:
+                    print(f"[PMTiles] Warning: Could not generate PMTiles: {pmtiles_error}")
+                    # Continue without PMTiles - fallback to GeoJSON
+            finally:
+                ndjson_path.unlink(missing_ok=True)
             
             # Clean up
             if temp_dir:
@@ -593,46 +1151,99 @@ async def health_check():
     return {"status": "healthy", "service": "geo-swipe-lab-api"}
 
 
+# In-memory index of processed layers (layer id -> layer data). Built once at
+# startup and kept in sync by the upload and delete endpoints.
+LAYERS: dict = {}
+
+# Upload file_id (the uuid suffix of a layer id) -> layer id
+LAYER_FILE_IDS: dict = {}
+
+# file_id lengths: uuid4().hex from /api/upload, its first 8 chars from /api/upload-local
+FILE_ID_LENGTHS = (32, 8)
+
+
+def make_layer_data(filename: str, has_pmtiles: bool) -> dict:
+    """Build the /api/layers entry for a processed file (format: name_uuid.ext)"""
+    stem, ext = os.path.splitext(filename)
+    
+    layer_data = {
+        "id": stem,  # Use full stem as ID for uniqueness
+        "name": stem.rsplit('_', 1)[0] if '_' in stem else stem,
+        "type": "raster" if ext.lower() in ['.tif', '.tiff'] else "vector",
+        "url": f"/processed/{filename}"
+    }
+    
+    if has_pmtiles:
+        layer_data["pmtilesUrl"] = f"/processed/{stem}.pmtiles"
+    
+    return layer_data
+
+
+def scan_processed_layers() -> dict:
+    """Scan PROCESSED_DIR and build the layer index"""
+    layers = {}
+    
+    # os.scandir yields file type info from readdir, no extra stat per entry
+    with os.scandir(PROCESSED_DIR) as it:
+        listing = [entry.name for entry in it if entry.is_file()]
+    names = set(listing)
+    
+    for name in listing:
+        stem, ext = os.path.splitext(name)
+        
+        # Skip PMTiles when there's a matching GeoJSON (same base name)
+        if ext.lower() == '.pmtiles':
+            continue
+        
+        # Skip if we've already seen this ID
+        if stem in layers:
+            continue
+        
+        # Check for PMTiles companion file in the same listing
+        has_pmtiles = f"{stem}.pmtiles" in names
+        layers[stem] = make_layer_data(name, has_pmtiles)
+    
+    return layers
+
+
+def parse_file_id(layer_id: str) -> Optional[str]:
+    """Return the file_id of a layer id the upload endpoints created
+    ({name}_{uuid hex}), or None for other names (e.g. files added by hand)
+    """
+    _, sep, file_id = layer_id.rpartition('_')
+    if sep and len(file_id) in FILE_ID_LENGTHS and all(c in '0123456789abcdef' for c in file_id):
+        return file_id
+    return None
+
+
+def index_layer(layer_data: dict) -> None:
+    """Add a layer to LAYERS and its file_id alias to LAYER_FILE_IDS"""
+    layer_id = layer_data["id"]
+    LAYERS[layer_id] = layer_data
+    file_id = parse_file_id(layer_id)
+    if file_id:
+        LAYER_FILE_IDS[file_id] = layer_id
+
+
+def register_layer(result: dict) -> None:
+    """Add a freshly processed layer (process_file_sync result) to the index"""
+    filename = result["url"].rsplit('/', 1)[-1]
+    index_layer(make_layer_data(filename, "pmtilesUrl" in result))
+
+
+@app.on_event("startup")
+async def load_layer_index():
+    """Build the in-memory layer index from PROCESSED_DIR"""
+    LAYERS.clear()
+    LAYER_FILE_IDS.clear()
+    for layer_data in scan_processed_layers().values():
+        index_layer(layer_data)
+
+
 @app.get("/api/layers")
 async def list_layers():
-    """List all processed layers"""
-    layers = []
-    seen_ids = set()  # Track seen IDs to prevent duplicates
-    
-    for file in PROCESSED_DIR.iterdir():
-        if file.is_file():
-            # Skip PMTiles when there's a matching GeoJSON (same base name)
-            if file.suffix.lower() == '.pmtiles':
-                continue
-                
-            layer_type = "raster" if file.suffix.lower() in ['.tif', '.tiff'] else "vector"
-            
-            # Extract the UUID portion from filename (format: name_uuid.ext)
-            # Use full stem as ID for uniqueness
-            layer_id = file.stem
-            
-            # Skip if we've already seen this ID
-            if layer_id in seen_ids:
-                continue
-            seen_ids.add(layer_id)
-            
-            # Check for PMTiles companion file
-            pmtiles_path = PROCESSED_DIR / f"{file.stem}.pmtiles"
-            pmtiles_url = f"/processed/{file.stem}.pmtiles" if pmtiles_path.exists() else None
-            
-            layer_data = {
-                "id": layer_id,
-                "name": file.stem.rsplit('_', 1)[0] if '_' in file.stem else file.stem,
-                "type": layer_type,
-                "url": f"/processed/{file.name}"
-            }
-            
-            if pmtiles_url:
-                layer_data["pmtilesUrl"] = pmtiles_url
-            
-            layers.append(layer_data)
-    
-    return {"layers": layers}
+    """List all processed layers (served from the in-memory index)"""
+    return {"layers": list(LAYERS.values())}
 
 
 @app.get("/api/uploads")
@@ -640,14 +1251,15 @@ async def list_uploads():
     """List files in uploads directory (for local file processing)"""
     files = []
     
-    for file in UPLOAD_DIR.iterdir():
-        if file.is_file():
-            file_type = "raster" if is_raster_file(file.name) else "vector" if is_vector_file(file.name) else "unknown"
-            files.append({
-                "filename": file.name,
-                "size_mb": round(file.stat().st_size / (1024 * 1024), 2),
-                "type": file_type
-            })
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file():
+                file_type = "raster" if is_raster_file(entry.name) else "vector" if is_vector_file(entry.name) else "unknown"
+                files.append({
+                    "filename": entry.name,
+                    "size_mb": round(entry.stat().st_size / (1024 * 1024), 2),
+                    "type": file_type
+                })
     
     return {"files": files}
 
@@ -664,7 +1276,7 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="No filename provided")
     
     # Generate unique ID - use full UUID to prevent collisions
-    file_id = str(uuid.uuid4())
+    file_id = uuid.uuid4().hex
     
     # Stream file to uploads directory first
     input_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
@@ -673,7 +1285,7 @@ async def upload_file(file: UploadFile = File(...)):
         # Stream upload to disk in chunks
         await stream_upload_to_disk(file, input_path)
         
-        # Process in thread pool (CPU-intensive)
+        # Process in process pool (CPU-intensive)
         loop = asyncio.get_event_loop()
         result = await loop.run_in_executor(
             executor,
@@ -683,6 +1295,8 @@ async def upload_file(file: UploadFile = File(...)):
             file_id
         )
         
+        get_file_stat.cache_clear()
+        register_layer(result)
         return JSONResponse(result)
         
     except Exception as e:
@@ -718,35 +1332,76 @@ async def process_local_file(request: LocalFileRequest):
         )
     
     # Generate unique ID
-    file_id = str(uuid.uuid4())[:8]
+    file_id = uuid.uuid4().hex[:8]
     
     try:
-        # Process in thread pool (CPU-intensive)
+        # Process in process pool (CPU-intensive)
         loop = asyncio.get_event_loop()
         result = await loop.run_in_executor(
             executor,
-            lambda: process_file_sync(input_path, filename, file_id, keep_source=True)
+            process_file_sync,
+            input_path,
+            filename,
+            file_id,
+            True  # keep_source (arguments must be picklable for the process pool)
         )
         
+        get_file_stat.cache_clear()
+        register_layer(result)
         return JSONResponse(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+def evict_file_caches(path_strs: list) -> None:
+    """Forget cached state of removed files: pooled readers, header/profile/render
+    caches, stat results and rendered tiles (runs in the tile thread pool)
+    """
+    for path_str in path_strs:
+        close_pooled_readers(path_str)
+        TILE_CACHE.evict(path_str)
+    
+    # lru_cache can't drop single keys; these are cheap to rebuild
+    get_file_stat.cache_clear()
+    read_file_header.cache_clear()
+    get_tiff_profile.cache_clear()
+    get_render_spec.cache_clear()
+
+
 @app.delete("/api/layers/{layer_id}")
 async def delete_layer(layer_id: str):
     """Delete a processed layer"""
-    deleted = False
-    for file in PROCESSED_DIR.iterdir():
-        if file.stem.endswith(layer_id):
-            file.unlink()
-            deleted = True
-            break
-    
-    if deleted:
-        return {"success": True, "message": f"Layer {layer_id} deleted"}
-    raise HTTPException(status_code=404, detail="Layer not found")
+    # Security: prevent path traversal
+    if ".." in layer_id or "/" in layer_id:
+        raise HTTPException(status_code=400, detail="Invalid layer id")
+    
+    # Files are named {original_name}_{file_id}.{ext}; the id is either the full
+    # stem (from /api/layers) or the file_id (from an upload response)
+    stem = layer_id if layer_id in LAYERS else LAYER_FILE_IDS.get(layer_id)
+    layer = LAYERS.get(stem) if stem else None
+    if layer is None:
+        raise HTTPException(status_code=404, detail="Layer not found")
+    
+    # Remove the PMTiles companion, then the layer file; the index entry is only
+    # dropped once the files are gone, so a failed unlink leaves the layer listed
+    paths = [PROCESSED_DIR / url.rsplit('/', 1)[-1] for url in (layer.get("pmtilesUrl"), layer["url"]) if url]
+    loop = asyncio.get_event_loop()
+    try:
+        for path in paths:
+            path.unlink(missing_ok=True)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not delete layer {layer_id}: {e}")
+    finally:
+        # Drop everything cached for the files (readers hold them open)
+        await loop.run_in_executor(tile_executor, evict_file_caches, [str(path) for path in paths])
+    
+    LAYERS.pop(stem, None)
+    file_id = parse_file_id(stem)
+    if file_id and LAYER_FILE_IDS.get(file_id) == stem:
+        del LAYER_FILE_IDS[file_id]
+    
+    return {"success": True, "message": f"Layer {layer_id} deleted"}
 
 
 if __name__ == "__main__":